@@ -1,6 +1,7 @@
 import json
 from typing import Dict, List, Optional
 from dataclasses import dataclass
+from stylometry import StylometryEngine, format_writing_style
 
 @dataclass
 class ChatStyle:
@@ -10,6 +11,9 @@ class ChatStyle:
     examples: List[Dict[str, str]]
 
 class ChatPromptGenerator:
+    def __init__(self, stylometry: Optional[StylometryEngine] = None):
+        self.stylometry = stylometry or StylometryEngine()
+
     @staticmethod
     def get_chat_styles() -> Dict[str, ChatStyle]:
         """Define different chat styles."""
@@ -61,10 +65,12 @@ class ChatPromptGenerator:
             )
         }
 
-    def generate_chat_prompt(self, profile_data: Dict, style: str, personality_analysis: str) -> str:
+    def generate_chat_prompt(self, profile_data: Dict, style: str, personality_analysis: str,
+                             tweets: Optional[List[Dict]] = None) -> str:
         """Generate a chat prompt for text-generation-webui."""
         styles = self.get_chat_styles()
         chat_style = styles.get(style, styles['professional'])
+        writing_style = format_writing_style(self.stylometry.writing_style(profile_data, tweets))
         
         # Format the examples
         examples_text = ""
@@ -81,6 +87,9 @@ Communication Style: {chat_style.name}
 {chat_style.description}
 Primary Tone: {chat_style.tone}
 
+Writing Style (measured from their tweets):
+{writing_style}
+
 Guidelines:
 1. Maintain the authentic voice and perspective of {profile_data.get('username', 'Unknown')}
 2. Use their characteristic expressions and language patterns
@@ -106,15 +115,13 @@ def main():
     # Example profile data
     profile = {
         "username": "Elon Musk",
-        "description": "CEO of X, SpaceX, Tesla, and Neuralink",
-        "writing_style": {
-            "avg_words_per_tweet": 15,
-            "uses_emojis": True,
-            "capitalization": "mixed",
-            "uses_hashtags": True
-        }
+        "description": "CEO of X, SpaceX, Tesla, and Neuralink"
     }
     
+    # Writing style is computed from the processed tweets
+    with open('processed_data/processed_elonmusk.json', 'r', encoding='utf-8') as f:
+        tweets = json.load(f).get('tweets', [])
+    
     # Example personality analysis
     personality = """Key traits:
 - Direct and concise communication
@@ -125,7 +132,7 @@ def main():
     
     # Generate prompts for different styles
     for style in ['comedy', 'professional', 'visionary']:
-        prompt = generator.generate_chat_prompt(profile, style, personality)
+        prompt = generator.generate_chat_prompt(profile, style, personality, tweets)
         
         # Save to file
         os.makedirs('chat_prompts', exist_ok=True)
@@ -0,0 +1,393 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from chat_prompts import ChatPromptGenerator
+from prompt_templates import PromptTemplates
+from stylometry import DEFAULT_STYLE_CACHE_DIR, StylometryEngine
+from twitter_data_processor import CODEC_EXTENSIONS, open_text
+
+PROMPT_KINDS = ('personality', 'chat', 'creative')
+
+NO_ANALYSIS_FALLBACK = "No personality analysis is available yet; infer their traits from the writing style and examples below."
+
+def estimate_size(obj: Any) -> int:
+    """Roughly estimate the memory used by a JSON-like object."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(estimate_size(v) for v in obj)
+    return size
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class LRUCache:
+    """Bounded LRU cache that evicts by estimated memory use.
+
+    Each entry records the signatures of the files it was built from and is
+    dropped on access if any of them has changed since.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Any, Tuple[Any, int, Dict[str, Optional[Tuple[int, int]]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, size, deps = entry
+        if any(file_signature(path) != sig for path, sig in deps.items()):
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any, deps: Dict[str, Optional[Tuple[int, int]]], size: Optional[int] = None):
+        if size is None:
+            size = estimate_size(value)
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (value, size, deps)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Any):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+class PromptService:
+    def __init__(self, data_dir: str = "processed_data", curated_dir: str = "curated_tweets",
+                 analysis_dir: str = "test_results", max_bytes: int = 256 * 1024 * 1024,
+                 latency_window: int = 10000, style_cache_dir: Optional[str] = DEFAULT_STYLE_CACHE_DIR):
+        self.data_dir = data_dir
+        self.curated_dir = curated_dir
+        self.analysis_dir = analysis_dir
+        self.profiles = LRUCache(max_bytes // 2)
+        self.prompts = LRUCache(max_bytes // 2)
+        # Styles are stored on the cached profiles, so they count towards max_bytes
+        self.chat_generator = ChatPromptGenerator(StylometryEngine(style_cache_dir, keep_in_memory=False))
+        self.templates = PromptTemplates(self.chat_generator.stylometry)
+        self.chat_styles = set(self.chat_generator.get_chat_styles())
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    def processed_candidates(self, username: str) -> List[str]:
+        """Return the possible processed files for a user, in order of preference."""
+        path = os.path.join(self.data_dir, f"processed_{username}.json")
+        return [path] + [path + ext for ext in CODEC_EXTENSIONS.values()]
+
+    def profile_paths(self, username: str) -> Dict[str, str]:
+        return {
+            'curated': os.path.join(self.curated_dir, f"curated_processed_{username}.json"),
+            'analysis': os.path.join(self.analysis_dir, f"claude_personality_analysis_analysis_{username}.json.txt")
+        }
+
+    def load_profile(self, username: str) -> Tuple[Optional[Dict], Dict[str, Optional[Tuple[int, int]]], int]:
+        """Load a user's processed tweets, curated tweets and analysis from disk.
+
+        Returns the profile, the signatures of every file it depends on and
+        its estimated size. Runs in the executor, so the size walk does not
+        block the event loop.
+        """
+        paths = self.profile_paths(username)
+        candidates = self.processed_candidates(username)
+        # Take signatures before reading so a concurrent write invalidates the entry.
+        # Every candidate is tracked, so a newly written preferred file does too.
+        deps = {path: file_signature(path) for path in candidates + list(paths.values())}
+        processed_path = next((path for path in candidates if deps[path] is not None), None)
+        if processed_path is None:
+            return None, deps, 0
+
+        with open_text(processed_path) as f:
+            processed = json.load(f)
+        if 'tweets' not in processed:
+            # Output of twitter_data_processor is keyed by author id
+            processed = next((p for p in processed.values() if isinstance(p, dict) and 'tweets' in p), {})
+        tweets = processed.get('tweets', [])
+        if 'profile' in processed:
+            profile_data = dict(processed['profile'])
+        else:
+            # Author-keyed output keeps profile fields (totals, sampling info) at the top level
+            profile_data = {key: value for key, value in processed.items() if key != 'tweets'}
+
+        relevant_tweets = []
+        if deps[paths['curated']] is not None:
+            with open(paths['curated'], 'r', encoding='utf-8') as f:
+                relevant_tweets = json.load(f).get('relevant_tweets', [])
+
+        analysis = None
+        if deps[paths['analysis']] is not None:
+            with open(paths['analysis'], 'r', encoding='utf-8') as f:
+                analysis = f.read()
+
+        profile_data['username'] = username
+        profile_data['writing_style'] = self.chat_generator.stylometry.writing_style(profile_data, tweets)
+
+        if profile_data.get('sampled'):
+            # Only the tweet list is sampled; account metrics come from the full stream
+            total = profile_data.get('seen', len(tweets))
+            avg_likes = profile_data.get('total_favorites', 0) / total if total else 0
+            avg_retweets = profile_data.get('total_retweets', 0) / total if total else 0
+        else:
+            total = len(tweets)
+            avg_likes = sum(t.get('favorite_count', 0) for t in tweets) / total if total else 0
+            avg_retweets = sum(t.get('retweet_count', 0) for t in tweets) / total if total else 0
+
+        profile = {
+            'deps': deps,
+            'profile_data': profile_data,
+            'tweets': tweets,
+            'relevant_tweets': relevant_tweets or sorted(
+                tweets, key=lambda t: t.get('favorite_count', 0), reverse=True)[:50],
+            'analysis': analysis,
+            'metrics': {
+                'total_tweets': total,
+                'avg_likes': avg_likes,
+                'avg_retweets': avg_retweets
+            }
+        }
+        return profile, deps, estimate_size(profile)
+
+    def render_prompt(self, profile: Dict, kind: str, style: str) -> str:
+        profile_data = profile['profile_data']
+        if kind == 'personality':
+            return self.templates.generate_personality_prompt(
+                profile_data, profile['metrics'], profile['relevant_tweets'])
+        # profile_data carries the precomputed writing_style, so no tweets are passed
+        if kind == 'chat':
+            return self.chat_generator.generate_chat_prompt(
+                profile_data, style, profile['analysis'] or NO_ANALYSIS_FALLBACK)
+        return self.templates.generate_creative_prompt(profile_data, profile['metrics'])
+
+    async def get_profile(self, username: str) -> Optional[Dict]:
+        cached = self.profiles.get(username)
+        if cached is not None:
+            return cached
+
+        # Concurrent misses for the same user share a single load
+        pending = self._loading.get(username)
+        if pending is not None:
+            profile, _, _ = await pending
+            return profile
+
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(None, self.load_profile, username)
+        self._loading[username] = pending
+        try:
+            profile, deps, size = await pending
+        finally:
+            self._loading.pop(username, None)
+        if profile is not None:
+            self.profiles.put(username, profile, deps, size)
+        return profile
+
+    async def get_prompt(self, username: str, kind: str, style: str = 'professional') -> Optional[str]:
+        """Return a rendered prompt, serving it from the cache when the source files are unchanged."""
+        if kind != 'chat':
+            style = ''
+        key = (username, kind, style)
+        cached = self.prompts.get(key)
+        if cached is not None:
+            return cached
+
+        profile = await self.get_profile(username)
+        if profile is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        prompt = await loop.run_in_executor(None, self.render_prompt, profile, kind, style)
+        self.prompts.put(key, prompt, profile['deps'])
+        return prompt
+
+    def record_latency(self, seconds: float):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def stats(self) -> Dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(pct: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(pct * len(latencies)))] * 1000, 3)
+
+        return {
+            'requests': self.requests,
+            'latency_ms': {
+                'p50': percentile(0.5),
+                'p90': percentile(0.9),
+                'p99': percentile(0.99),
+                'max': percentile(1.0)
+            },
+            'profile_cache': self.profiles.stats(),
+            'prompt_cache': self.prompts.stats()
+        }
+
+class PromptServer:
+    """Minimal HTTP/1.1 server exposing PromptService.
+
+    Routes:
+        GET /prompts/<username>/<personality|chat|creative>[?style=<style>]
+        GET /stats
+        GET /health
+    """
+
+    def __init__(self, service: PromptService, host: str = "127.0.0.1", port: int = 8080):
+        self.service = service
+        self.host = host
+        self.port = port
+
+    async def handle_request(self, method: str, target: str) -> Tuple[int, str, str]:
+        if method != 'GET':
+            return 405, 'text/plain', 'Method not allowed'
+
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+
+        if parts == ['health']:
+            return 200, 'text/plain', 'ok'
+        if parts == ['stats']:
+            return 200, 'application/json', json.dumps(self.service.stats(), indent=2)
+
+        if len(parts) != 3 or parts[0] != 'prompts' or parts[2] not in PROMPT_KINDS:
+            return 404, 'text/plain', 'Not found'
+
+        username, kind = parts[1], parts[2]
+        if os.path.basename(username) != username or username.startswith('.'):
+            return 400, 'text/plain', 'Invalid username'
+
+        style = parse_qs(url.query).get('style', ['professional'])[0]
+        if kind == 'chat' and style not in self.service.chat_styles:
+            return 400, 'text/plain', f"Unknown style: {style}"
+
+        prompt = await self.service.get_prompt(username, kind, style)
+        if prompt is None:
+            return 404, 'text/plain', f"No processed data for {username}"
+        return 200, 'text/plain; charset=utf-8', prompt
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    method, target, version = None, None, 'HTTP/1.0'
+
+                if method is None:
+                    status, content_type, body = 400, 'text/plain', 'Bad request'
+                else:
+                    try:
+                        status, content_type, body = await self.handle_request(method, target)
+                    except Exception as e:
+                        print(f"Error handling {method} {target}: {type(e).__name__}: {str(e)}")
+                        status, content_type, body = 500, 'text/plain', 'Internal server error'
+                self.service.record_latency(time.perf_counter() - start)
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                payload = body.encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"Serving prompts on http://{self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve personality, chat and creative prompts over HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind to')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--data-dir', default='processed_data', help='Directory of processed tweet files')
+    parser.add_argument('--curated-dir', default='curated_tweets', help='Directory of curated tweet files')
+    parser.add_argument('--analysis-dir', default='test_results', help='Directory of personality analyses')
+    parser.add_argument('--style-cache-dir', default=DEFAULT_STYLE_CACHE_DIR,
+                        help='Directory of cached writing style profiles, shared with twitter_data_processor')
+    parser.add_argument('--max-memory-mb', type=int, default=256, help='Memory budget for cached profiles and prompts')
+
+    args = parser.parse_args()
+
+    service = PromptService(args.data_dir, args.curated_dir, args.analysis_dir,
+                            max_bytes=args.max_memory_mb * 1024 * 1024,
+                            style_cache_dir=args.style_cache_dir)
+    try:
+        asyncio.run(PromptServer(service, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        print("\nShutting down")
+
+if __name__ == "__main__":
+    main()
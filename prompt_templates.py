@@ -1,7 +1,11 @@
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
+from stylometry import StylometryEngine, format_writing_style
 
 class PromptTemplates:
+    def __init__(self, stylometry: Optional[StylometryEngine] = None):
+        self.stylometry = stylometry or StylometryEngine()
+
     @staticmethod
     def personality_analysis_template() -> str:
         """Template for generating personality analysis from Twitter data."""
@@ -57,6 +61,9 @@ Profile Data:
 Tweet Patterns:
 {tweet_patterns}
 
+Writing Style:
+{writing_style}
+
 Create one of the following creative outputs:
 1. A "day in the life" narrative that captures their typical thought patterns
 2. A sitcom episode outline based on their tweet style and interests
@@ -110,9 +117,13 @@ Average Retweets: {metrics.get('avg_retweets', 0):.2f}"""
             behavioral_metrics=self.format_tweet_metrics(metrics)
         )
 
-    def generate_creative_prompt(self, profile_data: Dict, tweet_patterns: Dict) -> str:
+    def generate_creative_prompt(self, profile_data: Dict, tweet_patterns: Dict,
+                                 tweets: Optional[List[Dict]] = None) -> str:
         """Generate a complete creative analysis prompt."""
+        writing_style = self.stylometry.writing_style(profile_data, tweets)
+
         return self.creative_analysis_template().format(
             profile_data=self.format_profile_data(profile_data),
-            tweet_patterns=json.dumps(tweet_patterns, indent=2)
+            tweet_patterns=json.dumps(tweet_patterns, indent=2),
+            writing_style=format_writing_style(writing_style)
         ) 
\ No newline at end of file
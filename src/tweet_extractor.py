@@ -1,9 +1,14 @@
 from typing import Dict, List, Optional
 import json
 import os
+import sys
 from dataclasses import dataclass
 from datetime import datetime
 
+# Make the repository root importable when run as a script from src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from twitter_data_processor import open_text, strip_compression_extension
+
 @dataclass
 class TweetMetrics:
     engagement_score: float
@@ -84,7 +89,7 @@ class TweetExtractor:
         try:
             # Load processed data
             input_path = os.path.join(self.data_dir, filename)
-            with open(input_path, 'r', encoding='utf-8') as f:
+            with open_text(input_path) as f:
                 data = json.load(f)
 
             # Select relevant tweets
@@ -102,7 +107,7 @@ class TweetExtractor:
             }
 
             # Save curated data
-            output_filename = f"curated_{os.path.basename(filename)}"
+            output_filename = f"curated_{strip_compression_extension(os.path.basename(filename))}"
             output_path = os.path.join(self.output_dir, output_filename)
             
             with open(output_path, 'w', encoding='utf-8') as f:
@@ -119,7 +124,7 @@ def main():
     
     # Process all files in the processed_data directory
     for filename in os.listdir(extractor.data_dir):
-        if filename.startswith('processed_') and filename.endswith('.json'):
+        if filename.startswith('processed_') and strip_compression_extension(filename).endswith('.json'):
             print(f"Extracting relevant tweets from {filename}...")
             result = extractor.extract_and_save(filename)
             
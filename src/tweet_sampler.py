@@ -0,0 +1,110 @@
+import heapq
+import math
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+TIME_BUCKETS = {
+    'year': 4,
+    'month': 7,
+    'day': 10,
+}
+
+def engagement_weight(tweet: Dict) -> float:
+    """Sampling weight based on likes and retweets, matching TweetExtractor's scoring."""
+    return 1.0 + (tweet.get('favorite_count', 0) or 0) + 2.0 * (tweet.get('retweet_count', 0) or 0)
+
+def uniform_weight(tweet: Dict) -> float:
+    return 1.0
+
+WEIGHTINGS: Dict[str, Callable[[Dict], float]] = {
+    'uniform': uniform_weight,
+    'engagement': engagement_weight,
+}
+
+class StratifiedSampler:
+    """One-pass, bounded-memory tweet sampler stratified by time bucket and post type.
+
+    Each tweet gets a random key ``log(u) / weight`` (weighted reservoir
+    sampling), so heavier tweets are more likely to survive. The sampler keeps
+    the ``sample_size`` highest keys overall plus the ``min_per_stratum``
+    highest keys within every (time bucket, post type) stratum, so quiet
+    months and rare post types are still represented. Memory is bounded by
+    ``sample_size + strata * min_per_stratum`` regardless of account size.
+    """
+
+    def __init__(self, sample_size: int, seed: Optional[int] = 0, time_bucket: str = 'month',
+                 weighting: str = 'uniform', min_per_stratum: Optional[int] = None):
+        if sample_size <= 0:
+            raise ValueError("sample_size must be positive")
+        if time_bucket not in TIME_BUCKETS:
+            raise ValueError(f"Unknown time bucket: {time_bucket}")
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting: {weighting}")
+
+        self.sample_size = sample_size
+        self.time_bucket = time_bucket
+        self.weight_fn = WEIGHTINGS[weighting]
+        self.min_per_stratum = min_per_stratum if min_per_stratum is not None else max(1, sample_size // 100)
+        self.rng = random.Random(seed)
+        self.seen = 0
+        self.stratum_counts: Dict[Tuple[str, str], int] = {}
+        self._global: List[Tuple[float, int, Dict]] = []
+        self._strata: Dict[Tuple[str, str], List[Tuple[float, int, Dict]]] = {}
+
+    def stratum(self, tweet: Dict) -> Tuple[str, str]:
+        """Return the (time bucket, post type) stratum of a tweet."""
+        created = tweet.get('created_time') or tweet.get('created_at') or ''
+        bucket = created[:TIME_BUCKETS[self.time_bucket]] if created else 'unknown'
+        post_type = tweet.get('post_type') or ('retweet' if tweet.get('is_retweet') else 'post')
+        return bucket, post_type
+
+    def add(self, tweet: Dict):
+        seq = self.seen
+        self.seen += 1
+        stratum = self.stratum(tweet)
+        self.stratum_counts[stratum] = self.stratum_counts.get(stratum, 0) + 1
+
+        weight = self.weight_fn(tweet)
+        if weight <= 0:
+            return
+        # 1 - random() lies in (0, 1], so the log is always defined
+        key = math.log(1.0 - self.rng.random()) / weight
+        item = (key, seq, tweet)
+
+        self._offer(self._global, item, self.sample_size)
+        if self.min_per_stratum:
+            self._offer(self._strata.setdefault(stratum, []), item, self.min_per_stratum)
+
+    def extend(self, tweets: Iterable[Dict]):
+        for tweet in tweets:
+            self.add(tweet)
+
+    @staticmethod
+    def _offer(heap: List[Tuple[float, int, Dict]], item: Tuple[float, int, Dict], capacity: int):
+        if len(heap) < capacity:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def sample(self) -> List[Dict]:
+        """Return the sampled tweets in their original stream order."""
+        # Stratum minimums first, then fill from the global reservoir by key
+        chosen: Dict[int, Tuple[float, int, Dict]] = {}
+        for heap in self._strata.values():
+            for item in heap:
+                chosen[item[1]] = item
+        if len(chosen) > self.sample_size:
+            chosen = {item[1]: item for item in heapq.nlargest(self.sample_size, chosen.values())}
+
+        for item in sorted(self._global, reverse=True):
+            if len(chosen) >= self.sample_size:
+                break
+            chosen.setdefault(item[1], item)
+
+        return [tweet for _, _, tweet in sorted(chosen.values(), key=lambda item: item[1])]
+
+def sample_tweets(tweets: Iterable[Dict], sample_size: int, **kwargs) -> List[Dict]:
+    """Draw a stratified sample from a stream of tweets in one pass."""
+    sampler = StratifiedSampler(sample_size, **kwargs)
+    sampler.extend(tweets)
+    return sampler.sample()
@@ -0,0 +1,290 @@
+import json
+import os
+import re
+import html
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+
+URL_PATTERN = re.compile(r'https?://\S+')
+MENTION_PATTERN = re.compile(r'@\w+')
+HASHTAG_PATTERN = re.compile(r'#\w+')
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+EMOJI_PATTERN = re.compile(
+    '[\U0001F300-\U0001FAFF\U0001F1E6-\U0001F1FF\u2600-\u27BF\u2B00-\u2BFF]'
+)
+
+DEFAULT_STYLE_CACHE_DIR = "style_profiles"
+
+STOP_WORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could
+did do does don't for from get got had has have he her him his how i i'm if in into
+is it it's its just like me more my no not of on one only or our out so some than
+that that's the their them then there they this to too up us was we were what when
+which who will with would you you're your
+""".split())
+
+@dataclass
+class StyleProfile:
+    tweet_count: int
+    avg_words_per_tweet: float
+    median_words_per_tweet: float
+    avg_chars_per_tweet: float
+    median_chars_per_tweet: float
+    p90_chars_per_tweet: float
+    emoji_rate: float
+    emojis_per_tweet: float
+    hashtag_rate: float
+    mention_rate: float
+    link_rate: float
+    capitalization: str
+    lowercase_tweet_ratio: float
+    all_caps_word_ratio: float
+    exclamation_rate: float
+    question_rate: float
+    ellipsis_rate: float
+    line_break_rate: float
+    ends_with_period_ratio: float
+    reply_ratio: float
+    retweet_ratio: float
+    original_ratio: float
+    has_reply_signal: bool
+    top_words: List[Tuple[str, int]] = field(default_factory=list)
+    top_bigrams: List[Tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def uses_emojis(self) -> bool:
+        return self.emoji_rate >= 0.05
+
+    @property
+    def uses_hashtags(self) -> bool:
+        return self.hashtag_rate >= 0.05
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['uses_emojis'] = self.uses_emojis
+        data['uses_hashtags'] = self.uses_hashtags
+        return data
+
+def tweet_set_key(tweets: List[Dict]) -> str:
+    """Build a cache key from the set of tweet ids (falling back to the text)."""
+    ids = sorted(str(t.get('id') or t.get('text', '')) for t in tweets)
+    return hashlib.sha1('\n'.join(ids).encode('utf-8')).hexdigest()
+
+def _median(values: List[int]) -> float:
+    if not values:
+        return 0.0
+    n = len(values)
+    mid = n // 2
+    return float(values[mid]) if n % 2 else (values[mid - 1] + values[mid]) / 2
+
+def _percentile(values: List[int], pct: float) -> float:
+    if not values:
+        return 0.0
+    return float(values[min(len(values) - 1, int(pct * len(values)))])
+
+def _capitalization_label(lowercase_ratio: float, all_caps_ratio: float, cased_tweets: int) -> str:
+    if not cased_tweets:
+        return 'unknown'
+    if all_caps_ratio >= 0.2:
+        return 'frequent all-caps'
+    if lowercase_ratio >= 0.7:
+        return 'mostly lowercase'
+    if lowercase_ratio <= 0.2:
+        return 'standard sentence case'
+    return 'mixed'
+
+def compute_style_profile(tweets: List[Dict], top_n: int = 10) -> StyleProfile:
+    """Compute stylometric features for a list of tweets in a single pass."""
+    word_lengths = []
+    char_lengths = []
+    emoji_tweets = emoji_total = 0
+    hashtag_tweets = mention_tweets = link_tweets = 0
+    lowercase_tweets = cased_tweets = 0
+    caps_words = alpha_words = 0
+    exclamations = questions = ellipses = line_breaks = period_endings = 0
+    replies = retweets = 0
+    has_reply_signal = False
+    word_counts = Counter()
+    bigram_counts = Counter()
+
+    for tweet in tweets:
+        raw_text = tweet.get('text') or ''
+        text = html.unescape(raw_text).replace('\u2019', "'")
+
+        post_type = tweet.get('post_type', '')
+        if post_type or tweet.get('in_reply_to_post_id') is not None:
+            has_reply_signal = True
+        if tweet.get('is_retweet') or post_type in ('repost', 'retweet') or text.startswith('RT @'):
+            retweets += 1
+        elif post_type == 'reply' or tweet.get('in_reply_to_post_id') or text.startswith('@'):
+            replies += 1
+
+        if URL_PATTERN.search(text):
+            link_tweets += 1
+        if tweet.get('hashtags') or HASHTAG_PATTERN.search(text):
+            hashtag_tweets += 1
+        if tweet.get('mentions') or tweet.get('mentioned_users') or MENTION_PATTERN.search(text):
+            mention_tweets += 1
+
+        emojis = len(EMOJI_PATTERN.findall(text))
+        if emojis:
+            emoji_tweets += 1
+            emoji_total += emojis
+
+        # Measure the author's own prose, without links and leading handles
+        body = MENTION_PATTERN.sub('', URL_PATTERN.sub('', text)).strip()
+        char_lengths.append(len(body))
+        tokens = body.split()
+        word_lengths.append(len(tokens))
+
+        if any(c.isalpha() for c in body):
+            cased_tweets += 1
+            if body == body.lower():
+                lowercase_tweets += 1
+        for token in tokens:
+            if token.isalpha():
+                alpha_words += 1
+                if len(token) > 1 and token.isupper():
+                    caps_words += 1
+
+        exclamations += '!' in body
+        questions += '?' in body
+        ellipses += '...' in body or '…' in body
+        line_breaks += '\n' in body
+        period_endings += body.endswith('.') and not body.endswith('...')
+
+        words = WORD_PATTERN.findall(body.lower())
+        content_words = [w for w in words if w not in STOP_WORDS and len(w) > 1]
+        word_counts.update(content_words)
+        bigram_counts.update(f"{a} {b}" for a, b in zip(words, words[1:])
+                             if a not in STOP_WORDS or b not in STOP_WORDS)
+
+    total = len(tweets) or 1
+    word_lengths.sort()
+    char_lengths.sort()
+    lowercase_ratio = lowercase_tweets / cased_tweets if cased_tweets else 0.0
+    all_caps_ratio = caps_words / alpha_words if alpha_words else 0.0
+
+    return StyleProfile(
+        tweet_count=len(tweets),
+        avg_words_per_tweet=round(sum(word_lengths) / total, 2),
+        median_words_per_tweet=_median(word_lengths),
+        avg_chars_per_tweet=round(sum(char_lengths) / total, 2),
+        median_chars_per_tweet=_median(char_lengths),
+        p90_chars_per_tweet=_percentile(char_lengths, 0.9),
+        emoji_rate=round(emoji_tweets / total, 3),
+        emojis_per_tweet=round(emoji_total / total, 3),
+        hashtag_rate=round(hashtag_tweets / total, 3),
+        mention_rate=round(mention_tweets / total, 3),
+        link_rate=round(link_tweets / total, 3),
+        capitalization=_capitalization_label(lowercase_ratio, all_caps_ratio, cased_tweets),
+        lowercase_tweet_ratio=round(lowercase_ratio, 3),
+        all_caps_word_ratio=round(all_caps_ratio, 3),
+        exclamation_rate=round(exclamations / total, 3),
+        question_rate=round(questions / total, 3),
+        ellipsis_rate=round(ellipses / total, 3),
+        line_break_rate=round(line_breaks / total, 3),
+        ends_with_period_ratio=round(period_endings / total, 3),
+        reply_ratio=round(replies / total, 3),
+        retweet_ratio=round(retweets / total, 3),
+        original_ratio=round((len(tweets) - replies - retweets) / total, 3),
+        # Without post types or reply ids, a 0% reply rate would be a guess
+        has_reply_signal=has_reply_signal or replies > 0,
+        top_words=word_counts.most_common(top_n),
+        top_bigrams=bigram_counts.most_common(top_n)
+    )
+
+def format_writing_style(style: Dict) -> str:
+    """Format a writing style profile for use in prompts."""
+    if not style:
+        return "No writing style data available"
+
+    lines = [
+        f"Average Words per Tweet: {style.get('avg_words_per_tweet', 'N/A')}",
+        f"Capitalization: {style.get('capitalization', 'N/A')}",
+        f"Uses Emojis: {'yes' if style.get('uses_emojis') else 'rarely'}",
+        f"Uses Hashtags: {'yes' if style.get('uses_hashtags') else 'rarely'}",
+    ]
+    if 'reply_ratio' in style and style.get('has_reply_signal', True):
+        lines.append(f"Replies: {style['reply_ratio']:.0%} of tweets, "
+                     f"Originals: {style.get('original_ratio', 0):.0%}")
+    if 'exclamation_rate' in style:
+        lines.append(f"Punctuation: '!' in {style['exclamation_rate']:.0%}, "
+                     f"'?' in {style.get('question_rate', 0):.0%}, "
+                     f"line breaks in {style.get('line_break_rate', 0):.0%} of tweets")
+    if style.get('top_words'):
+        lines.append("Favorite Words: " + ", ".join(w for w, _ in style['top_words']))
+    if style.get('top_bigrams'):
+        lines.append("Common Phrases: " + ", ".join(b for b, _ in style['top_bigrams']))
+    return "\n".join(lines)
+
+class StylometryEngine:
+    def __init__(self, cache_dir: Optional[str] = None, top_n: int = 10, keep_in_memory: bool = True):
+        self.cache_dir = cache_dir
+        self.top_n = top_n
+        # Long-running callers that bound their own memory can opt out of the in-memory cache
+        self.keep_in_memory = keep_in_memory
+        self._cache: Dict[str, Tuple[str, StyleProfile]] = {}
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_path(self, username: str) -> str:
+        return os.path.join(self.cache_dir, f"style_{username}.json")
+
+    def _load_cached(self, username: str, key: str) -> Optional[StyleProfile]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(username), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not isinstance(cached, dict) or cached.get('key') != key:
+            return None
+        try:
+            style = dict(cached['style'])
+            style.pop('uses_emojis', None)
+            style.pop('uses_hashtags', None)
+            style['top_words'] = [tuple(w) for w in style.get('top_words', [])]
+            style['top_bigrams'] = [tuple(b) for b in style.get('top_bigrams', [])]
+            return StyleProfile(**style)
+        except (KeyError, TypeError, ValueError):
+            # Written by an older version with a different field set
+            return None
+
+    def _save_cached(self, username: str, key: str, style: StyleProfile):
+        if not self.cache_dir:
+            return
+        with open(self._cache_path(username), 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'style': style.to_dict()}, f, indent=2, ensure_ascii=False)
+
+    def get_style(self, username: str, tweets: List[Dict]) -> StyleProfile:
+        """Return the style profile for a user, recomputing only if their tweet set changed."""
+        key = tweet_set_key(tweets)
+        cached = self._cache.get(username)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        style = self._load_cached(username, key)
+        if style is None:
+            style = compute_style_profile(tweets, self.top_n)
+            self._save_cached(username, key, style)
+
+        if self.keep_in_memory:
+            self._cache[username] = (key, style)
+        return style
+
+    def writing_style(self, profile_data: Dict, tweets: Optional[List[Dict]] = None) -> Dict:
+        """Compute the writing style from tweets, falling back to any provided writing_style."""
+        tweets = tweets if tweets is not None else profile_data.get('tweets')
+        if tweets:
+            username = profile_data.get('username', 'Unknown')
+            return self.get_style(username, tweets).to_dict()
+        return profile_data.get('writing_style', {})
+
+    def get_styles(self, profiles: Dict[str, List[Dict]]) -> Dict[str, StyleProfile]:
+        """Compute style profiles for many users in one batch."""
+        return {username: self.get_style(username, tweets)
+                for username, tweets in profiles.items()}
@@ -1,11 +1,175 @@
 import json
 import os
-from typing import Dict, List
+import io
+import gzip
+import lzma
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 from datetime import datetime
 import argparse
 
-def load_tweets(file_path: str) -> List[Dict]:
-    """Load tweets from the raw data file."""
+from src.tweet_sampler import StratifiedSampler, WEIGHTINGS
+from stylometry import DEFAULT_STYLE_CACHE_DIR, StylometryEngine
+
+try:
+    import zstandard
+except ImportError:  # zstandard is only needed for .zst files
+    zstandard = None
+
+COMPRESSION_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+    b'\xfd7zXZ\x00': 'xz',
+}
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.zst': 'zstd',
+    '.xz': 'xz',
+}
+
+CODEC_EXTENSIONS = {codec: ext for ext, codec in COMPRESSION_EXTENSIONS.items()}
+
+PAGE_MARKER = '{"data":'
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """Detect the compression codec of a file from its magic bytes."""
+    with open(file_path, 'rb') as f:
+        header = f.read(6)
+    for magic, codec in COMPRESSION_MAGIC.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+def strip_compression_extension(file_path: str) -> str:
+    """Remove a trailing ``.gz``/``.xz``/``.zst`` extension, if any."""
+    root, ext = os.path.splitext(file_path)
+    return root if ext.lower() in COMPRESSION_EXTENSIONS else file_path
+
+def open_text(file_path: str, mode: str = 'r', codec: Optional[str] = None) -> TextIO:
+    """Open a plain or compressed text file as a UTF-8 stream.
+
+    When reading, the codec is detected from the file's magic bytes. When
+    writing, it is taken from ``codec`` or inferred from the file extension.
+    """
+    if mode not in ('r', 'w'):
+        raise ValueError(f"Unsupported mode: {mode}")
+
+    if codec is None:
+        if mode == 'r':
+            codec = detect_compression(file_path)
+        else:
+            codec = COMPRESSION_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+    if codec is None:
+        return open(file_path, mode, encoding='utf-8')
+    if codec == 'gzip':
+        return gzip.open(file_path, mode + 't', encoding='utf-8')
+    if codec == 'xz':
+        return lzma.open(file_path, mode + 't', encoding='utf-8')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required for .zst files (pip install zstandard)")
+        raw = open(file_path, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    raise ValueError(f"Unsupported compression codec: {codec}")
+
+def iter_pages(file_path: str, chunk_size: int = 1024 * 1024) -> Iterator[Tuple[int, Dict]]:
+    """Stream-decode the concatenated API pages in a raw data file.
+
+    The file is read (and decompressed, if needed) in chunks and each
+    ``{"data": ...}`` page is decoded as soon as it is complete, so the
+    whole dump never has to be held in memory or written to disk. Yields
+    ``(part_number, page)`` pairs; malformed pages are reported and skipped.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    part = 0
+
+    with open_text(file_path) as f:
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                if eof:
+                    break
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = chunk
+                continue
+
+            if not buffer.startswith(PAGE_MARKER):
+                # Skip anything that isn't the start of a page
+                start = buffer.find(PAGE_MARKER)
+                if start == -1:
+                    # Keep a tail in case the marker straddles two chunks
+                    buffer = buffer[-(len(PAGE_MARKER) - 1):] if not eof else ""
+                    if not eof:
+                        chunk = f.read(chunk_size)
+                        eof = not chunk
+                        buffer += chunk
+                    continue
+                buffer = buffer[start:]
+
+            try:
+                data, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as je:
+                next_page = buffer.find(PAGE_MARKER, 1)
+                if next_page != -1 or eof:
+                    # The page is malformed rather than incomplete
+                    part += 1
+                    print(f"Error parsing part {part}: {je.msg}")
+                    buffer = buffer[next_page:] if next_page != -1 else ""
+                    continue
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+
+            part += 1
+            buffer = buffer[end:]
+            yield part, data
+
+def iter_tweets(file_path: str) -> Iterator[Dict]:
+    """Yield tweets one at a time from a raw (optionally compressed) data file."""
+    for i, data in iter_pages(file_path):
+        if isinstance(data, dict) and isinstance(data.get('data'), dict) and 'items' in data['data']:
+            tweets = data['data']['items'] or []
+            print(f"Successfully parsed part {i}, found {len(tweets)} tweets")
+            yield from tweets
+        else:
+            print(f"Skipping part {i}: unexpected structure")
+
+PROFILE_TOTALS = {
+    'total_favorites': 'favorite_count',
+    'total_retweets': 'retweet_count',
+    'total_replies': 'reply_count',
+    'total_quotes': 'quote_count',
+    'total_views': 'view_count',
+}
+
+def accumulate_profile_totals(tweets: Iterable[Dict], totals: Dict[str, Dict]) -> Iterator[Dict]:
+    """Pass tweets through unchanged while summing per-author totals into ``totals``."""
+    for tweet in tweets:
+        author_id = tweet.get('author_id')
+        if author_id and tweet.get('author_username'):
+            author_totals = totals.setdefault(author_id, {'seen': 0, **{key: 0 for key in PROFILE_TOTALS}})
+            author_totals['seen'] += 1
+            for total_key, field in PROFILE_TOTALS.items():
+                author_totals[total_key] += tweet.get(field, 0)
+        yield tweet
+
+def load_tweets(file_path: str, sampler: Optional[StratifiedSampler] = None,
+                totals: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """Load tweets from the raw data file.
+
+    If a sampler is given, tweets are streamed through it and only the
+    sample is kept in memory. Per-author totals over every streamed tweet
+    are then accumulated into ``totals``, if given.
+    """
     if not os.path.exists(file_path):
         print(f"Error: File not found at {file_path}")
         print(f"Current working directory: {os.getcwd()}")
@@ -15,48 +179,21 @@ def load_tweets(file_path: str) -> List[Dict]:
     print(f"File size: {os.path.getsize(file_path)} bytes")
     
     try:
-        # Read the file in chunks to handle large files
-        chunk_size = 1024 * 1024  # 1MB chunks
-        json_data = ""
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                json_data += chunk
-        
-        # Clean up any potential formatting issues
-        json_data = json_data.strip()
-        
-        # Split content at points where new JSON objects begin
-        json_parts = json_data.split('{"data":')
-        json_parts = [part for part in json_parts if part.strip()]
-        
-        print(f"\nFound {len(json_parts)} potential JSON objects")
-        
-        all_tweets = []
-        for i, part in enumerate(json_parts, 1):
-            try:
-                # Reconstruct the JSON object
-                if not part.startswith('{'):
-                    part = '{"data":' + part
-                
-                data = json.loads(part)
-                
-                if isinstance(data, dict) and 'data' in data and 'items' in data['data']:
-                    tweets = data['data']['items']
-                    all_tweets.extend(tweets)
-                    print(f"Successfully parsed part {i}, found {len(tweets)} tweets")
-                else:
-                    print(f"Skipping part {i}: unexpected structure")
-                    
-            except json.JSONDecodeError as je:
-                print(f"Error parsing part {i}: {je.msg}")
-                continue
-            except Exception as e:
-                print(f"Unexpected error in part {i}: {str(e)}")
-                continue
+        codec = detect_compression(file_path)
+        if codec:
+            print(f"Detected {codec} compression, decompressing as a stream")
+
+        if sampler is not None:
+            tweets = iter_tweets(file_path)
+            if totals is not None:
+                tweets = accumulate_profile_totals(tweets, totals)
+            sampler.extend(tweets)
+            all_tweets = sampler.sample()
+            print(f"\nSampled {len(all_tweets)} of {sampler.seen} tweets "
+                  f"across {len(sampler.stratum_counts)} strata")
+            return all_tweets
+
+        all_tweets = list(iter_tweets(file_path))
         
         print(f"\nTotal tweets loaded: {len(all_tweets)}")
         return all_tweets
@@ -80,11 +217,7 @@ def extract_profile_data(tweets: List[Dict]) -> Dict[str, Dict]:
             profiles[author_id] = {
                 'username': author_username,
                 'tweets': [],
-                'total_favorites': 0,
-                'total_retweets': 0,
-                'total_replies': 0,
-                'total_quotes': 0,
-                'total_views': 0
+                **{total_key: 0 for total_key in PROFILE_TOTALS}
             }
         
         # Add tweet data
@@ -99,6 +232,7 @@ def extract_profile_data(tweets: List[Dict]) -> Dict[str, Dict]:
             'view_count': tweet.get('view_count', 0),
             'source': tweet.get('source', ''),
             'post_type': tweet.get('post_type', ''),
+            'in_reply_to_post_id': tweet.get('in_reply_to_post_id'),
             'hashtags': tweet.get('text_tags', []) or [],
             'mentioned_users': tweet.get('text_tagged_users', []) or [],
             'media_urls': tweet.get('attached_medias_url', []) or [],
@@ -106,38 +240,74 @@ def extract_profile_data(tweets: List[Dict]) -> Dict[str, Dict]:
         }
         
         # Update profile metrics
-        profiles[author_id]['total_favorites'] += tweet_data['favorite_count']
-        profiles[author_id]['total_retweets'] += tweet_data['retweet_count']
-        profiles[author_id]['total_replies'] += tweet_data['reply_count']
-        profiles[author_id]['total_quotes'] += tweet_data['quote_count']
-        profiles[author_id]['total_views'] += tweet_data['view_count']
+        for total_key, field in PROFILE_TOTALS.items():
+            profiles[author_id][total_key] += tweet_data[field]
         
         profiles[author_id]['tweets'].append(tweet_data)
     
     return profiles
 
-def save_processed_data(profiles: Dict[str, Dict], output_file: str):
-    """Save the processed data to a JSON file."""
+def compressed_output_path(output_file: str, compression: Optional[str] = None) -> str:
+    """Return the output path with the extension matching ``compression``.
+
+    The codec's extension is appended when the path has none, and a path
+    whose extension names a different codec is rejected, so compressed
+    output is never written under a plain ``.json`` name.
+    """
+    if compression is None:
+        return output_file
+    if compression not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unsupported compression codec: {compression}")
+
+    inferred = COMPRESSION_EXTENSIONS.get(os.path.splitext(output_file)[1].lower())
+    if inferred == compression:
+        return output_file
+    if inferred is not None:
+        raise ValueError(f"Output file {output_file} is {inferred}-compressed, not {compression}")
+    return output_file + CODEC_EXTENSIONS[compression]
+
+def save_processed_data(profiles: Dict[str, Dict], output_file: str, compression: Optional[str] = None) -> str:
+    """Save the processed data to a JSON file, optionally compressed.
+
+    The codec is taken from ``compression`` or inferred from the output
+    extension (``.gz``, ``.xz`` or ``.zst``). Returns the path written.
+    """
+    output_file = compressed_output_path(output_file, compression)
     output_dir = os.path.dirname(output_file)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
         
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with open_text(output_file, 'w', codec=compression) as f:
         json.dump(profiles, f, indent=2, ensure_ascii=False)
+    return output_file
+
+def process_tweets(username: str, input_file: str = None, output_file: str = None,
+                   compression: Optional[str] = None, sample_size: Optional[int] = None,
+                   seed: Optional[int] = 0, weighting: str = 'uniform',
+                   style_cache_dir: Optional[str] = DEFAULT_STYLE_CACHE_DIR):
+    """Process tweets for a specific username.
 
-def process_tweets(username: str, input_file: str = None, output_file: str = None):
-    """Process tweets for a specific username."""
+    With ``sample_size`` set, a seeded stratified sample is drawn while
+    streaming the input. Only the tweet list is sampled: profile totals
+    still cover every tweet, and each profile records how it was sampled.
+    Writing styles are refreshed in one batch through the style cache in
+    ``style_cache_dir``, so unchanged profiles are not recomputed.
+    """
     # Set default file paths if not provided
     if input_file is None:
         input_file = f'data/raw/{username}_tweets.txt'
     if output_file is None:
         output_file = f'data/processed/{username}_profile.json'
     
+    output_file = compressed_output_path(output_file, compression)
+    
     print(f"Starting processing at {datetime.now()}")
     print(f"Processing tweets for @{username}")
     print(f"Loading tweets from {input_file}...")
     
-    tweets = load_tweets(input_file)
+    sampler = StratifiedSampler(sample_size, seed=seed, weighting=weighting) if sample_size else None
+    stream_totals = {}
+    tweets = load_tweets(input_file, sampler, stream_totals)
     
     if not tweets:
         print("No tweets were loaded. Please check the input file.")
@@ -150,8 +320,27 @@ def process_tweets(username: str, input_file: str = None, output_file: str = Non
         print("No profiles were extracted from the tweets.")
         return
     
+    for author_id, profile in profiles.items():
+        if sampler is None:
+            profile['sampled'] = False
+            continue
+        author_totals = stream_totals[author_id]
+        profile.update({total_key: author_totals[total_key] for total_key in PROFILE_TOTALS})
+        profile.update({
+            'sampled': True,
+            'sample_size': sample_size,
+            'seen': author_totals['seen'],
+            'seed': seed
+        })
+    
+    print("Computing writing styles...")
+    styles = StylometryEngine(style_cache_dir).get_styles(
+        {profile['username']: profile['tweets'] for profile in profiles.values()})
+    for profile in profiles.values():
+        profile['writing_style'] = styles[profile['username']].to_dict()
+    
     print(f"Saving processed data to {output_file}...")
-    save_processed_data(profiles, output_file)
+    save_processed_data(profiles, output_file, compression)
     
     print(f"Processing complete at {datetime.now()}")
     print(f"Found {len(profiles)} unique profiles")
@@ -164,10 +353,21 @@ def main():
     parser.add_argument('username', help='Twitter username to process')
     parser.add_argument('--input', help='Input file path (optional)')
     parser.add_argument('--output', help='Output file path (optional)')
+    parser.add_argument('--compress', choices=sorted(CODEC_EXTENSIONS),
+                        help='Compress the output, adding the codec extension to the output path if missing '
+                             '(default: inferred from the output extension)')
+    parser.add_argument('--sample-size', type=int,
+                        help='Keep a stratified sample of this many tweets instead of all of them')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for sampling')
+    parser.add_argument('--weighting', choices=sorted(WEIGHTINGS), default='uniform',
+                        help='Sampling weight for each tweet')
+    parser.add_argument('--style-cache-dir', default=DEFAULT_STYLE_CACHE_DIR,
+                        help='Directory for cached writing style profiles')
     
     args = parser.parse_args()
     
-    process_tweets(args.username, args.input, args.output)
+    process_tweets(args.username, args.input, args.output, args.compress,
+                   args.sample_size, args.seed, args.weighting, args.style_cache_dir)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file